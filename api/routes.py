@@ -1,15 +1,28 @@
-from fastapi import APIRouter, HTTPException
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from pydantic import ValidationError
 # Импорт новой логики чата
 from services.chat_service import chat_step
 from typing import List
 import json
 from pathlib import Path
 
-from models.university import StudentRequest, University
+from models.university import (
+    StudentRequest, University, EntSweepRequest,
+    UniversitySummary, RecommendationResponse, RecommendationsResponse
+)
 # Импортируем обе функции из ai_service.py и главную функцию рекомендаций
-from services.ai_service import parse_student_request, generate_ai_explanation
-from services.recommendation import recommend_by_structured_data, load_universities
-
+from services.ai_service import parse_student_request, generate_ai_explanation, fallback_explanation
+from services.recommendation import recommend_by_structured_data, sweep_ent_range
+from services.catalog import get_catalog, CatalogError
+from services.shared_cache import get_shared_cache, make_key
+from app.config import settings
+from app import profiling
+from app.responses import OrjsonResponse
+
+# Типизированные маршруты (response_model) остаются на классе ответа FastAPI по умолчанию:
+# так pydantic-core сериализует модель сразу в JSON. OrjsonResponse — только для dict-ответов.
 router = APIRouter(prefix="/api", tags=["api"])
 
 
@@ -17,14 +30,26 @@ router = APIRouter(prefix="/api", tags=["api"])
 # Вспомогательная синхронная логика для избежания дублирования кода
 # ----------------------------------------------------------------------
 
-def get_recommendations_with_ai_explanation(request: StudentRequest):
-    """Объединяет логику рекомендаций и генерацию ИИ-объяснений."""
+def get_recommendations_with_ai_explanation(request: StudentRequest) -> RecommendationsResponse:
+    """
+    Объединяет логику рекомендаций и генерацию ИИ-объяснений.
+    Вуз отдаётся краткой карточкой и только подходящими программами.
+    """
+
+    # 0. Готовый ответ из общего кэша воркеров (ключ включает версию каталога)
+    cache = get_shared_cache()
+    cache_key = make_key("recommendations", get_catalog().version, request.model_dump())
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return RecommendationsResponse.model_validate(cached)
 
     # 1. Получаем рекомендации
     recommendations = recommend_by_structured_data(request)
 
     # 2. Для каждой рекомендации генерируем объяснение от ИИ (Синхронный вызов)
     result = []
+    all_from_model = True
     for rec in recommendations:
         explanation = generate_ai_explanation(
             university_name=rec["university"]["name"],
@@ -33,27 +58,31 @@ def get_recommendations_with_ai_explanation(request: StudentRequest):
             specialties_match=rec["matching_specialties"],
             grant_chance=rec["grant_chance"]
         )
-
-        result.append({
-            "university": rec["university"],
-            "match_score": rec["match_score"],
-            "grant_chance": rec["grant_chance"],
-            "grant_percentage": rec["grant_percentage"],
-            "ai_explanation": explanation
-        })
-
-    return {
-        "success": True,
-        "recommendations": result,
-        "total_found": len(result)
-    }
+        if explanation == fallback_explanation(rec["university"]["name"]):
+            all_from_model = False
+
+        result.append(RecommendationResponse(
+            university=UniversitySummary.model_validate(rec["university"]),
+            match_score=rec["match_score"],
+            grant_chance=rec["grant_chance"],
+            grant_percentage=rec["grant_percentage"],
+            matching_specialties=rec["matching_specialties"],
+            matched_programs=rec["matched_programs"],
+            ai_explanation=explanation
+        ))
+
+    response = RecommendationsResponse(recommendations=result, total_found=len(result))
+    # Заглушки вместо ответа Gemini не кэшируем, иначе все воркеры отдавали бы их сутки
+    if cache is not None and all_from_model:
+        cache.set(cache_key, response.model_dump(mode="json"))
+    return response
 
 
 # ----------------------------------------------------------------------
 # 1. Endpoints для рекомендаций (FIXED)
 # ----------------------------------------------------------------------
 
-@router.post("/recommend")
+@router.post("/recommend", response_model=RecommendationsResponse)
 async def recommend_universities(request: StudentRequest):
     """
     Главный эндпоинт: ИИ-помощник + рекомендации по структуре.
@@ -66,7 +95,23 @@ async def recommend_universities(request: StudentRequest):
         raise HTTPException(status_code=500, detail=f"Recommendation error: {str(e)}")
 
 
-@router.post("/recommend-by-text")
+@router.post("/recommend/ent-sweep", response_class=OrjsonResponse)
+async def recommend_ent_sweep(request: EntSweepRequest):
+    """
+    "Что если": как меняются рекомендации при разных баллах ЕНТ (без ИИ-объяснений).
+    Первый шаг содержит полное состояние, последующие — только изменения.
+    """
+    if request.ent_from > request.ent_to:
+        raise HTTPException(status_code=400, detail="ent_from не может быть больше ent_to")
+
+    result = sweep_ent_range(request, request.ent_from, request.ent_to, request.top_n)
+    return {
+        "success": True,
+        **result
+    }
+
+
+@router.post("/recommend-by-text", response_model=RecommendationsResponse)
 async def recommend_by_text(user_query: dict):
     """
     Альтернативный эндпоинт: парсим текстовый запрос через ИИ.
@@ -99,37 +144,37 @@ async def recommend_by_text(user_query: dict):
 # 2. Endpoints для работы с вузами
 # ----------------------------------------------------------------------
 
-@router.get("/universities")
+@router.get("/universities", response_class=OrjsonResponse)
 async def get_all_universities():
     """
     Получить все вузы из базы.
     """
-    universities = load_universities()
+    catalog = get_catalog()
+    universities = catalog.all()
     return {
         "success": True,
         "universities": universities,
-        "total": len(universities)
+        "total": len(universities),
+        "catalog_version": catalog.version
     }
 
 
-@router.get("/universities/{university_id}")
+@router.get("/universities/{university_id}", response_class=OrjsonResponse)
 async def get_university_details(university_id: int):
     """
     Получить карточку одного вуза.
     """
-    universities = load_universities()
-
-    for uni in universities:
-        if uni["id"] == university_id:
-            return {
-                "success": True,
-                "university": uni
-            }
+    uni = get_catalog().get(university_id)
+    if uni is not None:
+        return {
+            "success": True,
+            "university": uni
+        }
 
     raise HTTPException(status_code=404, detail="Вуз не найден")
 
 
-@router.post("/compare")
+@router.post("/compare", response_class=OrjsonResponse)
 async def compare_universities(request: dict):
     """
     Сравнить вузы. Возвращает матрицу сравнения, удобную для табличного отображения.
@@ -141,8 +186,12 @@ async def compare_universities(request: dict):
             detail="Нужно выбрать минимум 2 вуза для сравнения"
         )
 
-    all_universities = load_universities()
-    selected = [u for u in all_universities if u["id"] in university_ids or str(u["id"]) in university_ids]
+    catalog = get_catalog()
+    selected = []
+    for uid in university_ids:
+        uni = catalog.get(int(uid)) if str(uid).isdigit() else None
+        if uni is not None and uni not in selected:
+            selected.append(uni)
 
     if len(selected) < 2:
         raise HTTPException(status_code=404, detail="Выбранные вузы не найдены или их недостаточно")
@@ -197,7 +246,7 @@ async def compare_universities(request: dict):
     }
 
 
-@router.get("/health")
+@router.get("/health", response_class=OrjsonResponse)
 async def health_check():
     """
     Проверка, что сервер живой.
@@ -206,7 +255,7 @@ async def health_check():
         "status": "ok",
         "message": "DataHub Backend работает!"
     }
-@router.post("/chat")
+@router.post("/chat", response_class=OrjsonResponse)
 async def chat_interaction(request: dict):
     """
     Обрабатывает один шаг диалога. Принимает текущий state и сообщение пользователя.
@@ -244,7 +293,132 @@ async def chat_interaction(request: dict):
         recommendation_response = get_recommendations_with_ai_explanation(student_request)
 
         # Добавляем рекомендации в финальный ответ чата
-        chat_result["recommendations"] = recommendation_response["recommendations"]
-        chat_result["total_found"] = recommendation_response["total_found"]
+        chat_result["recommendations"] = [r.model_dump() for r in recommendation_response.recommendations]
+        chat_result["total_found"] = recommendation_response.total_found
+
+    return chat_result
+
+# ----------------------------------------------------------------------
+# 3. Admin API: инкрементальное изменение каталога
+# ----------------------------------------------------------------------
+
+def require_admin(x_admin_token: str = Header(default="")):
+    """Пропускает запрос только с верным заголовком X-Admin-Token."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin API отключён")
+    if not hmac.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Неверный admin-токен")
+
+
+def apply_catalog_change(change, *args):
+    """Выполняет изменение каталога и переводит ошибки в HTTP-коды."""
+    try:
+        result = change(*args)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Не найдено: {e.args[0]}")
+    except CatalogError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+    response = {"success": True, "catalog_version": get_catalog().version}
+    if result is not None:
+        response["university"] = result
+    return response
+
+
+@router.get("/admin/catalog", dependencies=[Depends(require_admin)],
+             response_class=OrjsonResponse)
+async def get_catalog_stats():
+    """
+    Версия каталога и агрегаты (число вузов, программ, размер журнала).
+    """
+    return {"success": True, "catalog": get_catalog().stats()}
+
+
+@router.post("/admin/catalog/compact", dependencies=[Depends(require_admin)],
+             response_class=OrjsonResponse)
+async def compact_catalog():
+    """
+    Принудительно сворачивает журнал изменений в universities.json.
+    """
+    catalog = get_catalog()
+    catalog.compact()
+    return {"success": True, "catalog": catalog.stats()}
 
-    return chat_result
\ No newline at end of file
+
+@router.post("/admin/universities", dependencies=[Depends(require_admin)],
+             response_class=OrjsonResponse)
+async def create_university(university: dict):
+    """
+    Добавить вуз. Тело проверяется по модели University.
+    """
+    return apply_catalog_change(get_catalog().insert_university, university)
+
+
+@router.patch("/admin/universities/{university_id}", dependencies=[Depends(require_admin)],
+             response_class=OrjsonResponse)
+async def update_university(university_id: int, changes: dict):
+    """
+    Частично обновить вуз (например, min_ent_score или rating).
+    """
+    return apply_catalog_change(get_catalog().update_university, university_id, changes)
+
+
+@router.delete("/admin/universities/{university_id}", dependencies=[Depends(require_admin)],
+             response_class=OrjsonResponse)
+async def delete_university(university_id: int):
+    """
+    Удалить вуз.
+    """
+    return apply_catalog_change(get_catalog().delete_university, university_id)
+
+
+@router.post("/admin/universities/{university_id}/programs", dependencies=[Depends(require_admin)],
+             response_class=OrjsonResponse)
+async def create_program(university_id: int, program: dict):
+    """
+    Добавить программу в вуз. Тело проверяется по модели Program.
+    """
+    return apply_catalog_change(get_catalog().insert_program, university_id, program)
+
+
+@router.patch("/admin/universities/{university_id}/programs/{program_name}", dependencies=[Depends(require_admin)],
+             response_class=OrjsonResponse)
+async def update_program(university_id: int, program_name: str, changes: dict):
+    """
+    Частично обновить программу (например, min_ent_score или grant_percent).
+    """
+    return apply_catalog_change(get_catalog().update_program, university_id, program_name, changes)
+
+
+@router.delete("/admin/universities/{university_id}/programs/{program_name}", dependencies=[Depends(require_admin)],
+             response_class=OrjsonResponse)
+async def delete_program(university_id: int, program_name: str):
+    """
+    Удалить программу из вуза.
+    """
+    return apply_catalog_change(get_catalog().delete_program, university_id, program_name)
+
+
+@router.get("/admin/profiles", dependencies=[Depends(require_admin)],
+             response_class=OrjsonResponse)
+async def list_profiles():
+    """
+    Последние профили запросов (кольцевой буфер): длительность и время по фазам.
+    """
+    return {
+        "success": True,
+        "profiles": [p.summary() for p in reversed(profiling.profiles)]
+    }
+
+
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile_stacks(profile_id: int):
+    """
+    Профиль в формате collapsed stacks (для flamegraph.pl / speedscope).
+    """
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Профиль не найден")
+    return Response(content=profile.collapsed(), media_type="text/plain")
@@ -15,6 +15,23 @@ class Settings(BaseSettings):
     api_host: str = "0.0.0.0"
     api_port: int = 8000
 
+    # Admin API (пустой токен — admin API отключён)
+    admin_token: str = ""
+
+    # Каталог: сворачивать журнал изменений каждые N записей
+    catalog_compact_every: int = 100
+
+    # Общий для воркеров кэш (SQLite): ответы LLM и рекомендации
+    shared_cache_enabled: bool = True
+    shared_cache_ttl: int = 86400
+
+    # Профилирование запросов: X-Profile + X-Admin-Token или случайная выборка.
+    # Выключено — middleware не подключается вовсе.
+    profile_enabled: bool = False
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: int = 5
+    profile_buffer_size: int = 50
+
     # CORS
     allowed_origins: List[str] = [
         "http://localhost:3000",
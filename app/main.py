@@ -2,6 +2,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
+from app.profiling import ProfilingMiddleware
 from api import routes
 
 app = FastAPI(
@@ -19,6 +20,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Профилирование: при PROFILE_ENABLED=False middleware не подключается вовсе
+if settings.profile_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
 app.include_router(routes.router)
 
 @app.get("/")
@@ -0,0 +1,166 @@
+# app/profiling.py
+import asyncio
+import hmac
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Optional
+
+from app.config import settings
+
+# Кадры подписываются как "<модуль>.<функция>"; фаза определяется по самому
+# глубокому кадру, совпавшему с префиксом пакета, модуля или функции.
+# orjson и pydantic-core не имеют Python-кадров — их время попадает в вызывающий кадр.
+PHASES = [
+    ("llm", ("services.ai_service", "services.chat_service", "google", "grpc", "httpx", "httpcore")),
+    ("scoring", ("services.recommendation", "services.catalog")),
+    ("serialization", (
+        "fastapi.routing.serialize_response", "fastapi.encoders", "fastapi._compat",
+        "starlette.responses", "app.responses", "json", "pydantic", "pydantic_core",
+    )),
+]
+
+
+def _matches(label: str, prefix: str) -> bool:
+    return label == prefix or label.startswith(prefix + ".")
+
+
+def classify(stack):
+    """Возвращает фазу (llm / scoring / serialization / other) для свёрнутого стека."""
+    for label in reversed(stack):
+        for phase, prefixes in PHASES:
+            if any(_matches(label, prefix) for prefix in prefixes):
+                return phase
+    return "other"
+
+
+class RequestProfile:
+    """
+    Статистический профиль одного запроса: стеки потока event loop, снятые с
+    интервалом. Учитываются только сэмплы, когда в loop выполняется задача этого
+    запроса, поэтому параллельные запросы в тот же профиль не попадают.
+
+    Каждому стеку приписывается реальное время с предыдущего сэмпла, а не
+    интервал: сэмплер может ждать GIL дольше интервала, и подсчёт сэмплов
+    занижал бы время фаз.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, method: str, path: str):
+        self.id = next(self._ids)
+        self.method = method
+        self.path = path
+        self.thread_id = threading.get_ident()
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.interval = settings.profile_interval_ms / 1000
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.stacks = Counter()
+        self.stack_time = Counter()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 2)
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            if asyncio.current_task(self.loop) is not self.task:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                module = frame.f_globals.get("__name__", "?")
+                stack.append(f"{module}.{frame.f_code.co_name}")
+                frame = frame.f_back
+            if stack:
+                key = tuple(reversed(stack))
+                self.stacks[key] += 1
+                self.stack_time[key] += elapsed
+
+    def phases_ms(self) -> dict:
+        phases = Counter()
+        for stack, seconds in self.stack_time.items():
+            phases[classify(stack)] += seconds
+        return {phase: round(seconds * 1000, 1) for phase, seconds in phases.items()}
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "samples": sum(self.stacks.values()),
+            "phases_ms": self.phases_ms()
+        }
+
+    def collapsed(self) -> str:
+        """Стеки в формате collapsed stacks (flamegraph.pl, speedscope)."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common())
+
+
+# Кольцевой буфер последних профилей
+profiles = deque(maxlen=settings.profile_buffer_size)
+
+
+def get_profile(profile_id: int) -> Optional[RequestProfile]:
+    for profile in profiles:
+        if profile.id == profile_id:
+            return profile
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware: профилирует запрос, если передан заголовок X-Profile с
+    верным X-Admin-Token, или случайно с вероятностью profile_sample_rate.
+    Подключается в app/main.py только при PROFILE_ENABLED=True.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> bool:
+        if scope["type"] != "http" or scope["path"].startswith("/api/admin"):
+            return False
+        headers = dict(scope["headers"])
+        if settings.admin_token and headers.get(b"x-profile") and hmac.compare_digest(
+                headers.get(b"x-admin-token", b""), settings.admin_token.encode()):
+            return True
+        return random.random() < settings.profile_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # async-эндпоинты выполняются в потоке event loop, его и сэмплируем
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", str(profile.id).encode())]
+            await send(message)
+
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            profiles.append(profile)
@@ -0,0 +1,94 @@
+# benchmarks/bench_recommendations.py
+# Размер и время кодирования ответов:
+# - /recommend: старый формат (полный dict вуза + JSONResponse) против нового
+#   RecommendationsResponse. Типизированный маршрут FastAPI кодирует модель сразу
+#   в JSON через pydantic-core (model_dump_json); model_dump() + orjson приведён
+#   для сравнения — он медленнее, поэтому response_model-маршруты остаются на
+#   классе ответа по умолчанию.
+# - /recommend/ent-sweep (dict-ответ): JSONResponse против OrjsonResponse.
+#
+# Запуск из корня проекта: python benchmarks/bench_recommendations.py
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.responses import JSONResponse
+
+from app.responses import OrjsonResponse
+from models.university import (
+    StudentRequest, UniversitySummary, RecommendationResponse, RecommendationsResponse
+)
+from services.recommendation import recommend_by_structured_data, sweep_ent_range
+
+EXPLANATION = "Хороший выбор: ваш балл выше проходного, есть подходящие программы и высокие шансы на грант."
+ROUNDS = 2000
+
+
+def legacy_payload(recommendations):
+    return {
+        "success": True,
+        "recommendations": [
+            {
+                "university": rec["university"],
+                "match_score": rec["match_score"],
+                "grant_chance": rec["grant_chance"],
+                "grant_percentage": rec["grant_percentage"],
+                "ai_explanation": EXPLANATION
+            }
+            for rec in recommendations
+        ],
+        "total_found": len(recommendations)
+    }
+
+
+def lean_payload(recommendations):
+    result = [
+        RecommendationResponse(
+            university=UniversitySummary.model_validate(rec["university"]),
+            match_score=rec["match_score"],
+            grant_chance=rec["grant_chance"],
+            grant_percentage=rec["grant_percentage"],
+            matching_specialties=rec["matching_specialties"],
+            matched_programs=rec["matched_programs"],
+            ai_explanation=EXPLANATION
+        )
+        for rec in recommendations
+    ]
+    return RecommendationsResponse(recommendations=result, total_found=len(result))
+
+
+def run(cases):
+    print(f"{'case':<38} {'bytes':>8} {'encode, us':>12}")
+    for name, encode in cases.items():
+        size = len(encode())
+        seconds = timeit.timeit(encode, number=ROUNDS) / ROUNDS
+        print(f"{name:<38} {size:>8} {seconds * 1e6:>12.1f}")
+    print()
+
+
+def main():
+    request = StudentRequest(ent_score=100, preferred_specialties=["IT", "B057"], budget="any")
+    recommendations = recommend_by_structured_data(request)
+
+    legacy = legacy_payload(recommendations)
+    lean = lean_payload(recommendations)
+
+    print("/recommend")
+    run({
+        "legacy dict + JSONResponse": lambda: JSONResponse(legacy).body,
+        "lean model_dump_json (response_model)": lambda: lean.model_dump_json().encode(),
+        "lean model_dump + OrjsonResponse": lambda: OrjsonResponse(lean.model_dump()).body,
+    })
+
+    sweep = {"success": True, **sweep_ent_range(StudentRequest(preferred_specialties=["IT"]), 0, 140, 10)}
+    print("/recommend/ent-sweep")
+    run({
+        "dict + JSONResponse": lambda: JSONResponse(sweep).body,
+        "dict + OrjsonResponse": lambda: OrjsonResponse(sweep).body,
+    })
+
+
+if __name__ == "__main__":
+    main()
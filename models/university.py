@@ -8,6 +8,12 @@ class StudentRequest(BaseModel):
     preferred_specialties: Optional[List[str]] = Field(default_factory=list)
     budget: Optional[str] = "any"
 
+class EntSweepRequest(StudentRequest):
+    """Запрос "что если": рекомендации для каждого балла ЕНТ в диапазоне"""
+    ent_from: int = Field(..., ge=0, le=140)
+    ent_to: int = Field(..., ge=0, le=140)
+    top_n: int = Field(5, ge=1, le=20)
+
 class Program(BaseModel):
     """Программа обучения"""
     name: str
@@ -38,9 +44,27 @@ class University(BaseModel):
     partnerships: List[str] = Field(default_factory=list)
     rating: Optional[float] = None
 
+class UniversitySummary(BaseModel):
+    """Краткая карточка вуза для рекомендаций (полная — в /universities/{id})"""
+    id: int
+    name: str
+    city: str
+    type: str
+    min_ent_score: int
+    rating: Optional[float] = None
+    website: Optional[str] = None
+
 class RecommendationResponse(BaseModel):
-    university: dict
+    university: UniversitySummary
     match_score: float
     grant_chance: str
     grant_percentage: float
-    matching_specialties: List[str]
\ No newline at end of file
+    matching_specialties: List[str]
+    matched_programs: List[Program] = Field(default_factory=list)  # Только подходящие программы
+    ai_explanation: Optional[str] = None
+
+class RecommendationsResponse(BaseModel):
+    """Ответ /recommend и /recommend-by-text"""
+    success: bool = True
+    recommendations: List[RecommendationResponse]
+    total_found: int
\ No newline at end of file
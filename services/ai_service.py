@@ -1,6 +1,7 @@
 import json
 import google.generativeai as genai
 from app.config import settings
+from services.shared_cache import get_shared_cache, make_key
 
 genai.configure(api_key=settings.gemini_api_key)
 model = genai.GenerativeModel("gemini-1.5-flash")
@@ -15,6 +16,13 @@ def parse_student_request(user_query):
 
 JSON:"""
 
+    cache = get_shared_cache()
+    cache_key = make_key("parse_student_request", user_query)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     try:
         response = model.generate_content(prompt)
         response_text = response.text.strip()
@@ -27,12 +35,15 @@ JSON:"""
 
         parsed = json.loads(response_text)
 
-        return {
+        result = {
             "ent_score": parsed.get("ent_score"),
             "preferred_city": parsed.get("preferred_city"),
             "preferred_specialties": parsed.get("preferred_specialties", []),
             "budget": parsed.get("budget", "any")
         }
+        if cache is not None:
+            cache.set(cache_key, result)
+        return result
 
     except Exception as e:
         print(f"Error: {e}")
@@ -44,6 +55,11 @@ JSON:"""
         }
 
 
+def fallback_explanation(university_name):
+    """Текст-заглушка, когда Gemini недоступен (такие ответы не кэшируются)."""
+    return f"Вуз {university_name} хороший выбор!"
+
+
 def generate_ai_explanation(university_name, student_ent, uni_min_ent, specialties_match, grant_chance):
     if specialties_match:
         specs = ", ".join(specialties_match)
@@ -58,10 +74,20 @@ def generate_ai_explanation(university_name, student_ent, uni_min_ent, specialti
 
 Напиши короткое объяснение на русском."""
 
+    cache = get_shared_cache()
+    cache_key = make_key("ai_explanation", prompt)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     try:
         response = model.generate_content(prompt)
-        return response.text.strip()
+        explanation = response.text.strip()
+        if cache is not None:
+            cache.set(cache_key, explanation)
+        return explanation
 
     except Exception as e:
         print(f"Error: {e}")
-        return f"Вуз {university_name} хороший выбор!"
+        return fallback_explanation(university_name)
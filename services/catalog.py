@@ -0,0 +1,381 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from app.config import settings
+from models.university import Program, University
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "universities.json"
+LOG_PATH = Path(__file__).parent.parent / "data" / "universities.changes.jsonl"
+
+
+class CatalogError(Exception):
+    """Ошибка изменения каталога (вуз/программа не найдены или уже существуют)."""
+
+
+def write_atomic(path: Path, data: bytes):
+    """
+    Пишет файл через собственный временный файл (mkstemp) и os.replace.
+    mkstemp создаёт файл с правами 0600 — восстанавливаем права исходного файла.
+    """
+    mode = os.stat(path).st_mode & 0o777 if path.exists() else 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class Catalog:
+    """
+    Каталог вузов в памяти с инкрементально поддерживаемыми индексами.
+
+    Каждое изменение затрагивает только один вуз: его вклад в индексы и агрегаты
+    сначала вычитается, затем добавляется заново. Изменения пишутся в append-only
+    журнал, который периодически сворачивается обратно в universities.json.
+    Каждая запись журнала хранит версию каталога; после сворачивания журнал
+    начинается с записи "base" с текущей версией, поэтому версия только растёт.
+
+    Каждый воркер держит свою копию каталога; общие у них только файлы, доступ
+    к которым идёт через flock: запись — эксклюзивно, чтение — разделяемо. Воркер
+    помнит позицию в журнале и дочитывает только новые записи; полная перезагрузка
+    нужна лишь после сворачивания (журнал заменяется новым файлом).
+    """
+
+    def __init__(self, data_path: Optional[Path] = None, log_path: Optional[Path] = None,
+                 compact_every: Optional[int] = None):
+        self.data_path = Path(data_path or DATA_PATH)
+        self.log_path = Path(log_path or LOG_PATH)
+        self.compact_every = compact_every if compact_every is not None else settings.catalog_compact_every
+        self._lock_path = self.data_path.with_suffix(".lock")
+        self._lock = threading.RLock()
+        self._write_depth = 0
+
+        # Не читаем файлы посреди сворачивания, которое делает другой воркер
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._load()
+
+    def _reset(self):
+        self.version = 0
+        self.log_size = 0
+        self._log_ino = None
+        self._log_pos = 0
+        self._by_id: Dict[int, dict] = {}
+        # Порядок вузов в каталоге: выборки по индексам возвращаются в нём же
+        self._position: Dict[int, int] = {}
+        self._next_position = 0
+        # Индексы: город (lower) -> id вузов, код/группа программы (upper) -> id вузов
+        self._by_city: Dict[str, Set[int]] = {}
+        self._by_code: Dict[str, Dict[int, int]] = {}
+        self._with_grant: Set[int] = set()
+        # Агрегаты
+        self.programs_total = 0
+        self.grant_programs_total = 0
+
+    # ------------------------------------------------------------------
+    # Загрузка, журнал и блокировки между воркерами
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self, mode: int):
+        """flock на общем lock-файле: LOCK_SH для чтения, LOCK_EX для записи."""
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        """Полная загрузка: universities.json + весь журнал. Вызывается под flock."""
+        self._reset()
+        if self.data_path.exists():
+            with open(self.data_path, "r", encoding="utf-8") as f:
+                for uni in json.load(f):
+                    self._put(uni)
+        else:
+            print("Warning: universities.json not found!")
+        self._read_log_tail()
+
+    def _read_log_tail(self):
+        """Применяет записи журнала после запомненной позиции."""
+        if not self.log_path.exists():
+            return
+        with open(self.log_path, "rb") as f:
+            self._log_ino = os.fstat(f.fileno()).st_ino
+            f.seek(self._log_pos)
+            for line in f:
+                self._log_pos += len(line)
+                line = line.strip()
+                if line:
+                    self._apply(json.loads(line))
+
+    def _catch_up(self):
+        """Догоняет изменения других воркеров. Вызывается под flock."""
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._log_ino:
+            # Журнал свернули и заменили новым файлом — перечитываем всё
+            self._load()
+        elif st.st_size != self._log_pos:
+            self._read_log_tail()
+
+    def _apply(self, entry: dict):
+        """Применяет одну запись журнала."""
+        if entry["op"] == "put":
+            self._put(entry["university"])
+        elif entry["op"] == "delete":
+            self._delete(entry["id"])
+        if entry["op"] != "base":
+            self.log_size += 1
+        self.version = entry["version"]
+
+    def refresh(self):
+        """Подтягивает изменения, сделанные другими воркерами."""
+        with self._lock:
+            try:
+                st = os.stat(self.log_path)
+            except FileNotFoundError:
+                return
+            if st.st_ino == self._log_ino and st.st_size == self._log_pos:
+                return
+            with self._file_lock(fcntl.LOCK_SH):
+                self._catch_up()
+
+    @contextmanager
+    def _write_lock(self):
+        """Эксклюзивная блокировка записи между воркерами (flock) и потоками процесса."""
+        with self._lock:
+            if self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield
+                finally:
+                    self._write_depth -= 1
+                return
+
+            with self._file_lock(fcntl.LOCK_EX):
+                self._write_depth = 1
+                try:
+                    self._catch_up()
+                    yield
+                finally:
+                    self._write_depth = 0
+
+    def _append_log(self, entry: dict):
+        self.version += 1
+        entry["version"] = self.version
+        with open(self.log_path, "ab") as f:
+            f.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+            self._log_ino = os.fstat(f.fileno()).st_ino
+            self._log_pos = f.tell()
+        if entry["op"] != "base":
+            self.log_size += 1
+        if self.compact_every and self.log_size >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Записывает текущее состояние в universities.json и начинает новый журнал."""
+        with self._write_lock():
+            data = json.dumps(list(self._by_id.values()), ensure_ascii=False, indent=2)
+            write_atomic(self.data_path, data.encode("utf-8"))
+            # Новый файл журнала (новый inode) — сигнал другим воркерам перечитать всё.
+            # Версия в нём сохраняется записью "base".
+            base = json.dumps({"op": "base", "version": self.version}).encode("utf-8") + b"\n"
+            write_atomic(self.log_path, base)
+            self._log_ino = os.stat(self.log_path).st_ino
+            self._log_pos = len(base)
+            self.log_size = 0
+
+    # ------------------------------------------------------------------
+    # Инкрементальное обновление индексов
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _program_codes(prog: dict) -> List[str]:
+        return [prog[key].upper() for key in ("group_code", "code") if prog.get(key)]
+
+    def _index(self, uni: dict, sign: int):
+        uni_id = uni["id"]
+        city = uni["city"].lower()
+        programs = uni.get("programs", [])
+        grant_count = sum(1 for p in programs if p.get("grant_available"))
+
+        if sign > 0:
+            self._by_city.setdefault(city, set()).add(uni_id)
+            if grant_count:
+                self._with_grant.add(uni_id)
+        else:
+            self._by_city[city].discard(uni_id)
+            if not self._by_city[city]:
+                del self._by_city[city]
+            self._with_grant.discard(uni_id)
+
+        for prog in programs:
+            for code in self._program_codes(prog):
+                counts = self._by_code.setdefault(code, {})
+                counts[uni_id] = counts.get(uni_id, 0) + sign
+                if counts[uni_id] <= 0:
+                    del counts[uni_id]
+                if not counts:
+                    del self._by_code[code]
+
+        self.programs_total += sign * len(programs)
+        self.grant_programs_total += sign * grant_count
+
+    def _put(self, uni: dict):
+        old = self._by_id.get(uni["id"])
+        if old is not None:
+            self._index(old, -1)
+        else:
+            self._position[uni["id"]] = self._next_position
+            self._next_position += 1
+        self._by_id[uni["id"]] = uni
+        self._index(uni, +1)
+
+    def _delete(self, uni_id: int):
+        # Идемпотентно: после сбоя посреди сворачивания старый журнал может
+        # переиграться поверх уже свёрнутых данных
+        old = self._by_id.pop(uni_id, None)
+        if old is not None:
+            del self._position[uni_id]
+            self._index(old, -1)
+
+    # ------------------------------------------------------------------
+    # Чтение
+    # ------------------------------------------------------------------
+
+    def all(self) -> List[dict]:
+        with self._lock:
+            return list(self._by_id.values())
+
+    def get(self, uni_id: int) -> Optional[dict]:
+        return self._by_id.get(uni_id)
+
+    def candidates(self, city: Optional[str] = None, grant_only: bool = False) -> List[dict]:
+        """Вузы, прошедшие фильтры по городу и наличию грантов (по индексам)."""
+        with self._lock:
+            if city:
+                ids = sorted(self._by_city.get(city.lower(), ()), key=self._position.__getitem__)
+            else:
+                ids = self._by_id.keys()
+            if grant_only:
+                ids = [i for i in ids if i in self._with_grant]
+            return [self._by_id[i] for i in ids]
+
+    def ids_with_code(self, code: str) -> Set[int]:
+        """id вузов, у которых есть программа с таким кодом или группой ГОП."""
+        return set(self._by_code.get(code.upper(), {}))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "universities": len(self._by_id),
+                "programs": self.programs_total,
+                "grant_programs": self.grant_programs_total,
+                "cities": len(self._by_city),
+                "log_size": self.log_size
+            }
+
+    # ------------------------------------------------------------------
+    # Изменение (admin API)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _validate(data: dict) -> dict:
+        return University.model_validate(data).model_dump(exclude_none=True)
+
+    def _commit(self, uni: dict) -> dict:
+        """Сохраняет уже проверенный вуз."""
+        self._put(uni)
+        self._append_log({"op": "put", "university": uni})
+        return uni
+
+    def insert_university(self, data: dict) -> dict:
+        with self._write_lock():
+            # Сначала проверка модели: id "1" должен совпасть с существующим 1
+            uni = self._validate(data)
+            if uni["id"] in self._by_id:
+                raise CatalogError(f"Вуз с id={uni['id']} уже существует")
+            return self._commit(uni)
+
+    def update_university(self, uni_id: int, changes: dict) -> dict:
+        with self._write_lock():
+            uni = self._validate({**self._require(uni_id), **changes})
+            if uni["id"] != uni_id:
+                raise CatalogError("Нельзя изменить id вуза")
+            return self._commit(uni)
+
+    def delete_university(self, uni_id: int):
+        with self._write_lock():
+            self._require(uni_id)
+            self._delete(uni_id)
+            self._append_log({"op": "delete", "id": uni_id})
+
+    def insert_program(self, uni_id: int, data: dict) -> dict:
+        with self._write_lock():
+            uni = self._require(uni_id)
+            program = Program.model_validate(data).model_dump(exclude_none=True)
+            if self._find_program(uni, program["name"]) is not None:
+                raise CatalogError(f"Программа '{program['name']}' уже существует")
+            return self._commit(self._validate({**uni, "programs": uni.get("programs", []) + [program]}))
+
+    def update_program(self, uni_id: int, name: str, changes: dict) -> dict:
+        with self._write_lock():
+            uni = self._require(uni_id)
+            index = self._require_program(uni, name)
+            programs = list(uni["programs"])
+            programs[index] = Program.model_validate({**programs[index], **changes}).model_dump(exclude_none=True)
+            return self._commit(self._validate({**uni, "programs": programs}))
+
+    def delete_program(self, uni_id: int, name: str) -> dict:
+        with self._write_lock():
+            uni = self._require(uni_id)
+            index = self._require_program(uni, name)
+            programs = uni["programs"][:index] + uni["programs"][index + 1:]
+            return self._commit(self._validate({**uni, "programs": programs}))
+
+    def _require(self, uni_id: int) -> dict:
+        uni = self._by_id.get(uni_id)
+        if uni is None:
+            raise KeyError(uni_id)
+        return uni
+
+    @staticmethod
+    def _find_program(uni: dict, name: str) -> Optional[int]:
+        for i, prog in enumerate(uni.get("programs", [])):
+            if prog["name"] == name:
+                return i
+        return None
+
+    def _require_program(self, uni: dict, name: str) -> int:
+        index = self._find_program(uni, name)
+        if index is None:
+            raise KeyError(name)
+        return index
+
+
+_catalog: Optional[Catalog] = None
+
+
+def get_catalog() -> Catalog:
+    """Возвращает каталог процесса, подтягивая изменения других воркеров."""
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog()
+    else:
+        _catalog.refresh()
+    return _catalog
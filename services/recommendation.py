@@ -1,25 +1,23 @@
-import json
-from pathlib import Path
 from typing import List, Tuple
 from models.university import StudentRequest
+from services.catalog import get_catalog
 
 
 def load_universities():
-    """Загружает данные вузов из JSON-файла."""
-    data_path = Path(__file__).parent.parent / "data" / "universities.json"
-    if not data_path.exists():
-        print("Warning: universities.json not found!")
-        return []
-
-    with open(data_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Возвращает вузы из каталога в памяти (без повторного чтения JSON)."""
+    return get_catalog().all()
 
 
 def filter_universities(ent_score, preferred_city=None, preferred_specialties=None, budget="any"):
     """
     Фильтрует вузы по базовым критериям (ЕНТ, город, специальность, грант).
     """
-    universities = load_universities()
+    catalog = get_catalog()
+    # Город и наличие грантов отбираются по индексам каталога
+    universities = catalog.candidates(preferred_city, grant_only=(budget == "grant"))
+    code_matches = set()
+    for spec in preferred_specialties or []:
+        code_matches |= catalog.ids_with_code(spec)
     filtered = []
 
     for uni in universities:
@@ -27,28 +25,16 @@ def filter_universities(ent_score, preferred_city=None, preferred_specialties=No
         if ent_score is not None and ent_score < uni["min_ent_score"] - 5:
             continue
 
-        if preferred_city and uni["city"].lower() != preferred_city.lower():
-            continue
-
-        if preferred_specialties:
+        if preferred_specialties and uni["id"] not in code_matches:
+            # Совпадения по коду/группе уже найдены по индексу, остаётся поиск по названию
             programs = uni.get("programs", [])
             has_specialty = any(
-                any(
-                    spec.lower() in prog["name"].lower() or
-                    (prog.get("group_code") and spec.upper() == prog["group_code"].upper()) or
-                    (prog.get("code") and spec.upper() == prog["code"].upper())
-                    for spec in preferred_specialties
-                )
+                any(spec.lower() in prog["name"].lower() for spec in preferred_specialties)
                 for prog in programs
             )
             if not has_specialty:
                 continue
 
-        if budget == "grant":
-            programs_with_grant = [p for p in uni.get("programs", []) if p.get("grant_available")]
-            if not programs_with_grant:
-                continue
-
         filtered.append(uni)
 
     return filtered
@@ -135,6 +121,55 @@ def calculate_match_score(ent_score, uni_min_score, uni_rating, matching_count):
     return round(min(100, score), 1)
 
 
+def match_programs(uni, preferred_specialties):
+    """
+    Находит программы вуза, подходящие под специальности студента.
+    Возвращает (подходящие программы, их количество, программа с самым высоким проходным баллом).
+    """
+    matched_programs = []
+    matching_count = 0
+
+    best_program = None
+    best_min_ent_score = -1
+
+    for prog in uni.get("programs", []):
+        is_match = False
+
+        for spec in preferred_specialties:
+            spec_lower = spec.lower()
+
+            if (prog.get("group_code") and spec_lower == prog["group_code"].lower()) or \
+                    (prog.get("code") and spec_lower == prog["code"].lower()) or \
+                    (spec_lower in prog["name"].lower()):
+                is_match = True
+                break
+
+        if is_match:
+            matching_count += 1
+            matched_programs.append(prog)
+
+            if prog["min_ent_score"] > best_min_ent_score:
+                best_min_ent_score = prog["min_ent_score"]
+                best_program = prog
+
+    return matched_programs, matching_count, best_program
+
+
+def grant_chance_for(ent_score, uni, best_program):
+    """Шансы на грант: по лучшей подходящей программе или по вузу в целом."""
+    if best_program and ent_score:
+        return calculate_grant_chance(
+            ent_score,
+            best_program["min_ent_score"],
+            best_program.get("grant_percent", 50)
+        )
+    return calculate_grant_chance(
+        ent_score,
+        uni["min_ent_score"],
+        50
+    )
+
+
 def recommend_by_structured_data(request: StudentRequest):
     """
     Главная функция для получения рекомендаций по структурированному запросу.
@@ -149,45 +184,10 @@ def recommend_by_structured_data(request: StudentRequest):
 
     for uni in filtered_unis:
         uni_rating = uni.get("rating", 3.0)
-        matching_specs = []
-        matching_count = 0
-
-        best_program = None
-        best_min_ent_score = -1
-
-        for prog in uni.get("programs", []):
-            is_match = False
-
-            for spec in preferred_specialties:
-                spec_lower = spec.lower()
-
-                if (prog.get("group_code") and spec_lower == prog["group_code"].lower()) or \
-                        (prog.get("code") and spec_lower == prog["code"].lower()) or \
-                        (spec_lower in prog["name"].lower()):
-                    is_match = True
-                    break
-
-            if is_match:
-                matching_count += 1
-                matching_specs.append(prog["name"])
-
-                if prog["min_ent_score"] > best_min_ent_score:
-                    best_min_ent_score = prog["min_ent_score"]
-                    best_program = prog
+        matched_programs, matching_count, best_program = match_programs(uni, preferred_specialties)
 
         # Расчет шансов на грант
-        if best_program and ent_score:
-            grant_chance, grant_percentage = calculate_grant_chance(
-                ent_score,
-                best_program["min_ent_score"],
-                best_program.get("grant_percent", 50)
-            )
-        else:
-            grant_chance, grant_percentage = calculate_grant_chance(
-                ent_score,
-                uni["min_ent_score"],
-                50
-            )
+        grant_chance, grant_percentage = grant_chance_for(ent_score, uni, best_program)
 
         # Расчет итогового Match Score
         match_score = calculate_match_score(
@@ -202,10 +202,70 @@ def recommend_by_structured_data(request: StudentRequest):
             "match_score": match_score,
             "grant_chance": grant_chance,
             "grant_percentage": grant_percentage,
-            "matching_specialties": list(set(matching_specs))
+            "matching_specialties": list(set(prog["name"] for prog in matched_programs)),
+            "matched_programs": matched_programs
         })
 
     # Сортировка по Match Score
     recommendations.sort(key=lambda x: x["match_score"], reverse=True)
 
-    return recommendations[:5]
\ No newline at end of file
+    return recommendations[:5]
+
+
+def sweep_ent_range(request: StudentRequest, ent_from: int, ent_to: int, top_n: int = 5):
+    """
+    Рекомендации "что если" для каждого балла ЕНТ в диапазоне [ent_from, ent_to].
+
+    Кандидаты отбираются один раз (без учета ЕНТ), статичная часть расчета
+    (подходящие программы, рейтинг) считается один раз на вуз, а для каждого
+    балла пересчитываются только зависящие от ЕНТ части. Ответ кодируется
+    разностями: каждый шаг содержит только изменения относительно предыдущего.
+    """
+    preferred_specialties = request.preferred_specialties or []
+    candidates = filter_universities(None, request.preferred_city, preferred_specialties, request.budget)
+
+    static = []
+    for uni in candidates:
+        _, matching_count, best_program = match_programs(uni, preferred_specialties)
+        static.append((uni, uni.get("rating", 3.0), matching_count, best_program))
+
+    universities = {uni["id"]: {"id": uni["id"], "name": uni["name"], "city": uni["city"]} for uni in candidates}
+    steps = []
+    prev_ids = set()
+    prev_top = None
+    prev_grants = {}
+
+    for ent_score in range(ent_from, ent_to + 1):
+        scored = []
+        grants = {}
+        for uni, uni_rating, matching_count, best_program in static:
+            # Тот же допуск, что и в filter_universities (-5 баллов)
+            if ent_score < uni["min_ent_score"] - 5:
+                continue
+            grants[uni["id"]] = list(grant_chance_for(ent_score, uni, best_program))
+            scored.append((uni["id"], calculate_match_score(ent_score, uni["min_ent_score"], uni_rating, matching_count)))
+
+        scored.sort(key=lambda x: x[1], reverse=True)
+        top = [{"id": uid, "match_score": score} for uid, score in scored[:top_n]]
+        ids = set(grants)
+
+        step = {"ent_score": ent_score}
+        added = [uid for uid in grants if uid not in prev_ids]
+        removed = [uid for uid in prev_ids if uid not in ids]
+        if added:
+            step["added"] = added
+        if removed:
+            step["removed"] = removed
+        if top != prev_top:
+            step["top"] = top
+        changed_grants = {uid: g for uid, g in grants.items() if prev_grants.get(uid) != g}
+        if changed_grants:
+            step["grants"] = changed_grants
+        steps.append(step)
+
+        prev_ids, prev_top, prev_grants = ids, top, grants
+
+    return {
+        "universities": universities,
+        "steps": steps
+    }
@@ -0,0 +1,70 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from app.config import settings
+
+CACHE_PATH = Path(__file__).parent.parent / "data" / "shared_cache.sqlite3"
+
+
+class SharedCache:
+    """
+    Кэш, общий для всех воркеров на одной машине (SQLite в режиме WAL).
+
+    Используется для ответов LLM и готовых рекомендаций, чтобы добавление
+    воркеров не умножало число обращений к Gemini. Внешние сервисы не нужны.
+    """
+
+    def __init__(self, path: Optional[Path] = None, ttl: Optional[int] = None):
+        self.path = Path(path or CACHE_PATH)
+        self.ttl = ttl if ttl is not None else settings.shared_cache_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # mmap-чтение страниц базы: горячие записи разделяются воркерами через page cache
+        self._conn.execute("PRAGMA mmap_size=67108864")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+def make_key(namespace: str, *parts: Any) -> str:
+    """Стабильный ключ кэша из пространства имён и аргументов."""
+    return namespace + ":" + json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+_cache: Optional[SharedCache] = None
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Возвращает общий кэш или None, если он отключён в настройках."""
+    global _cache
+    if not settings.shared_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = SharedCache()
+        _cache.purge_expired()
+    return _cache
@@ -0,0 +1,26 @@
+# tests/conftest.py
+import shutil
+from types import SimpleNamespace
+
+import pytest
+
+from services import catalog, shared_cache
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Каталог и общий кэш тестов живут во временной папке, а не в data/"""
+    data_path = tmp_path / "universities.json"
+    shutil.copy(catalog.DATA_PATH, data_path)
+    paths = SimpleNamespace(
+        data=data_path,
+        log=tmp_path / "universities.changes.jsonl",
+        cache=tmp_path / "shared_cache.sqlite3"
+    )
+
+    monkeypatch.setattr(catalog, "DATA_PATH", paths.data)
+    monkeypatch.setattr(catalog, "LOG_PATH", paths.log)
+    monkeypatch.setattr(shared_cache, "CACHE_PATH", paths.cache)
+    monkeypatch.setattr(catalog, "_catalog", None)
+    monkeypatch.setattr(shared_cache, "_cache", None)
+    return paths
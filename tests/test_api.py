@@ -35,3 +35,165 @@ def test_recommend_endpoint():
     data = response.json()
     assert data["success"] == True
     assert "recommendations" in data
+
+
+def test_admin_program_update(monkeypatch):
+    """Тест admin API: изменение программы обновляет каталог и журнал"""
+    from app.config import settings
+    from services.catalog import Catalog
+
+    monkeypatch.setattr(settings, "admin_token", "secret")
+
+    assert client.get("/api/admin/catalog").status_code == 401
+
+    headers = {"X-Admin-Token": "secret"}
+    response = client.patch(
+        "/api/admin/universities/1/programs/Computer Science",
+        json={"min_ent_score": 99},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["catalog_version"] == 1
+    programs = client.get("/api/universities/1").json()["university"]["programs"]
+    assert programs[0]["min_ent_score"] == 99
+
+    # Журнал переигрывается при повторной загрузке
+    reloaded = Catalog()
+    assert reloaded.get(1)["programs"][0]["min_ent_score"] == 99
+
+
+def test_ent_sweep_endpoint():
+    """Тест "что если" по диапазону ЕНТ"""
+    payload = {
+        "preferred_city": "Алматы",
+        "preferred_specialties": ["IT"],
+        "budget": "grant",
+        "ent_from": 60,
+        "ent_to": 100
+    }
+    response = client.post("/api/recommend/ent-sweep", json=payload)
+    assert response.status_code == 200
+    steps = response.json()["steps"]
+    assert len(steps) == 41
+    assert "top" in steps[0]
+    # Шаги без изменений содержат только балл
+    assert any(set(step) == {"ent_score"} for step in steps[1:])
+
+
+def test_catalog_changes_visible_to_other_workers():
+    """Тест общего каталога: изменение в одном воркере видно другому"""
+    from services.catalog import Catalog
+
+    worker_a = Catalog(compact_every=0)
+    worker_b = Catalog(compact_every=0)
+
+    worker_a.update_university(1, {"min_ent_score": 90})
+    worker_b.refresh()
+    assert worker_b.version == worker_a.version == 1
+    assert worker_b.get(1)["min_ent_score"] == 90
+
+    # Версия сохраняется после сворачивания журнала
+    worker_b.compact()
+    assert Catalog().version == 1
+
+
+def test_request_profiling(monkeypatch):
+    """Тест профилирования по заголовку X-Profile"""
+    import time
+    from app.config import settings
+    from app.profiling import ProfilingMiddleware
+    from services import recommendation
+
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    filter_universities = recommendation.filter_universities
+
+    def slow_filter(*args, **kwargs):
+        time.sleep(0.1)
+        return filter_universities(*args, **kwargs)
+
+    monkeypatch.setattr(recommendation, "filter_universities", slow_filter)
+    profiled_client = TestClient(ProfilingMiddleware(app))
+    headers = {"X-Profile": "1", "X-Admin-Token": "secret"}
+
+    payload = {"ent_score": 100, "preferred_city": "Алматы", "ent_from": 100, "ent_to": 101}
+    response = profiled_client.post("/api/recommend/ent-sweep", json=payload, headers=headers)
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    response = profiled_client.get("/api/admin/profiles", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    summary = next(p for p in response.json()["profiles"] if str(p["id"]) == profile_id)
+    assert summary["samples"] > 0
+    # Время фаз считается по реальным интервалам между сэмплами
+    assert summary["phases_ms"]["scoring"] >= 80
+
+    response = profiled_client.get(f"/api/admin/profiles/{profile_id}", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "services.recommendation.sweep_ent_range" in response.text
+
+    # Без заголовка запрос не профилируется
+    response = profiled_client.post("/api/compare", json={"university_ids": [1, 2]})
+    assert "x-profile-id" not in response.headers
+
+
+def test_catalog_version_and_duplicate_ids():
+    """Тест каталога: версия не сбрасывается после сворачивания, id проверяется после валидации"""
+    from services.catalog import Catalog, CatalogError
+
+    catalog = Catalog(compact_every=0)
+
+    duplicate = {**catalog.get(1), "id": "1"}
+    with pytest.raises(CatalogError):
+        catalog.insert_university(duplicate)
+
+    catalog.update_university(1, {"rating": 4.9})
+    catalog.update_university(1, {"rating": 5.0})
+    catalog.compact()
+    assert Catalog().version == 2
+
+
+def test_catalog_survives_crash_during_compaction(data_dir):
+    """Тест каталога: старый журнал переигрывается поверх свёрнутых данных без ошибок"""
+    import json
+    import os
+    from services.catalog import Catalog
+
+    catalog = Catalog(compact_every=0)
+    catalog.update_university(2, {"city": "Астана"})
+    catalog.delete_university(10)
+    old_log = data_dir.log.read_bytes()
+    mode = os.stat(data_dir.data).st_mode & 0o777
+    catalog.compact()
+    # Сбой между заменой universities.json и журнала: журнал остался старым
+    data_dir.log.write_bytes(old_log)
+
+    reloaded = Catalog()
+    assert reloaded.get(10) is None
+    assert reloaded.version == catalog.version
+    assert [u["id"] for u in json.loads(data_dir.data.read_text(encoding="utf-8"))] == [u["id"] for u in reloaded.all()]
+    # Права файла сохраняются при атомарной перезаписи
+    assert os.stat(data_dir.data).st_mode & 0o777 == mode
+
+    # Порядок выборки по городу совпадает с порядком каталога после правок
+    in_astana = [u["id"] for u in reloaded.candidates("Астана")]
+    assert in_astana == [u["id"] for u in reloaded.all() if u["city"] == "Астана"]
+
+
+def test_recommendations_cache_skips_fallback(monkeypatch):
+    """Тест общего кэша: заглушки вместо ответа Gemini не кэшируются"""
+    from api import routes
+    from services.ai_service import fallback_explanation
+    from services.shared_cache import get_shared_cache
+
+    cache = get_shared_cache()
+    request = routes.StudentRequest(ent_score=90, preferred_specialties=["IT"])
+    cached_rows = lambda: cache._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    monkeypatch.setattr(routes, "generate_ai_explanation", lambda **kw: fallback_explanation(kw["university_name"]))
+    routes.get_recommendations_with_ai_explanation(request)
+    assert cached_rows() == 0
+
+    monkeypatch.setattr(routes, "generate_ai_explanation", lambda **kw: "Объяснение от модели")
+    routes.get_recommendations_with_ai_explanation(request)
+    assert cached_rows() == 1